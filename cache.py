@@ -0,0 +1,54 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+
+
+# Simple on-disk TTL cache for API responses. Unlike st.cache_data, entries
+# survive Streamlit restarts, so repeated symbols don't burn API quota across
+# reruns and redeploys.
+class FileCache:
+    def __init__(self, cache_dir=".cache"):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, endpoint, key):
+        digest = hashlib.md5(key.encode()).hexdigest()
+        return self.cache_dir / endpoint / f"{digest}.json"
+
+    def _read(self, endpoint, key):
+        try:
+            with open(self._path(endpoint, key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, endpoint, key, ttl):
+        # Returns the cached value, or None if missing, unreadable, or expired
+        entry = self._read(endpoint, key)
+        if entry is None or time.time() - entry["ts"] > ttl:
+            return None
+        return entry["data"]
+
+    def get_hash(self, endpoint, key):
+        # Content hash of the stored response body, ignoring expiry
+        entry = self._read(endpoint, key)
+        return entry.get("hash") if entry else None
+
+    def get_data(self, endpoint, key):
+        # Stored value regardless of expiry (for hash-match reuse)
+        entry = self._read(endpoint, key)
+        return entry["data"] if entry else None
+
+    def touch(self, endpoint, key):
+        # Restart the TTL clock on an entry whose content is known unchanged
+        entry = self._read(endpoint, key)
+        if entry is not None:
+            entry["ts"] = time.time()
+            with open(self._path(endpoint, key), "w") as f:
+                json.dump(entry, f)
+
+    def set(self, endpoint, key, data, body_hash=None):
+        path = self._path(endpoint, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"ts": time.time(), "data": data, "hash": body_hash}, f)
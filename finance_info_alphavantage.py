@@ -1,7 +1,16 @@
+import hashlib
+import os
+import re
+
 import streamlit as st
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
+
+from cache import FileCache
 
 # Set page configuration
 st.set_page_config(
@@ -10,11 +19,56 @@ st.set_page_config(
     layout="centered"
 )
 
-# API Key hardcoded - Replace this with your actual API key
-API_KEY = "4Qwr6xvgmRNu9DrSs25tp5xFwpc4eJ1Z"  # Financial Modeling Prep API key
+# Financial Modeling Prep API key, from Streamlit secrets or the environment
+# (never source control) so each deployment gets its own quota bucket
+try:
+    API_KEY = st.secrets.get("FMP_API_KEY", "")
+except FileNotFoundError:  # no secrets.toml present
+    API_KEY = ""
+API_KEY = API_KEY or os.environ.get("FMP_API_KEY", "")
+if not API_KEY:
+    st.error("Missing FMP_API_KEY. Add it to .streamlit/secrets.toml or set it in the environment.")
+    st.stop()
+
+# Shared HTTP session so repeated lookups reuse one keep-alive connection
+# instead of paying a new TCP + TLS handshake on every request; cached as a
+# resource so Streamlit reruns share the same connection pool
+@st.cache_resource
+def _session():
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=3, backoff_factor=0.3,
+                          status_forcelist=[429, 500, 502, 503, 504],
+                          raise_on_status=False)
+    ))
+    return session
+
+# Separate connect/read timeouts: fail fast on an unreachable host without
+# cutting slow-but-healthy responses short
+_TIMEOUT = (3.05, 10)
+
+# On-disk cache so warm quotes survive Streamlit restarts (60s is a sane
+# staleness window for "real-time" prices)
+CACHE = FileCache()
+QUOTE_TTL = 60
+
+# Tickers shown in the no-symbol guide, prefetched in one batch request
+COMMON_SYMBOLS = ("AAPL", "MSFT", "GOOGL", "AMZN", "META", "TSLA", "NFLX", "JPM")
+
+# Whitelist of valid ticker shapes (letters/digits plus . and - for listings
+# like BRK.B); one compiled C-level match instead of several Python passes
+_SYMBOL_RE = re.compile(r"^[A-Z0-9.\-]{1,10}$")
+
+# Sign prefix and CSS class for the change line, indexed by (change >= 0)
+_SIGN_CLASS = (("", "stock-change-negative"), ("+", "stock-change-positive"))
+
+# Resolve the timezone once at import instead of on every render
+_PACIFIC = ZoneInfo("US/Pacific")
 
-# Custom CSS
-st.markdown("""
+# Custom CSS, built once at import so reruns reuse the same string object
+_CSS = """
 <style>
     .main-header {
         font-size: 28px;
@@ -46,33 +100,61 @@ st.markdown("""
         font-weight: bold;  /* Make the date bold */
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # Title and description
 st.markdown('<div class="main-header">Stock Information Viewer</div>', unsafe_allow_html=True)
 st.markdown("Enter a stock symbol to get real-time information.")
 
-# Function to get stock data from Financial Modeling Prep API
+# Fall back to the most recent cached quote, even past its TTL, so an API
+# outage or rate limit degrades to slightly old data instead of an error
+def _stale_quote(symbol):
+    stale = CACHE.get_data("quote", symbol)
+    if stale is not None:
+        stale = dict(stale)
+        stale["stale"] = True
+    return stale
+
+# Function to get stock data from Financial Modeling Prep API; memoized
+# in-process so reruns within 30s skip even the disk cache
+@st.cache_data(ttl=30, max_entries=256, show_spinner=False)
 def get_stock_data(symbol):
     try:
         # Validate the symbol
         if not symbol or not isinstance(symbol, str):
             return None, "Error: Please enter a valid stock symbol."
         
-        # Clean the symbol
-        symbol = symbol.strip().upper()
-        
+        # Validate the symbol (the caller normalizes case/whitespace)
+        if not _SYMBOL_RE.match(symbol):
+            return None, "Error: Stock symbol should only contain letters, numbers, hyphens, or periods."
+
+        # Serve from the on-disk cache before touching the network
+        cached = CACHE.get("quote", symbol, ttl=QUOTE_TTL)
+        if cached is not None:
+            return cached, None
+
         # Make request to Financial Modeling Prep API with API key
         url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={API_KEY}"
-        response = requests.get(url, timeout=10)
-        
-        # Check response status
-        if response.status_code != 200:
-            return None, f"Error: API returned status code {response.status_code}"
-        
-        # Parse the response
-        data = response.json()
-        
+        response = _session().get(url, timeout=_TIMEOUT)
+        response.raise_for_status()
+
+        # If the body is byte-identical to what we last parsed, reuse the
+        # stored result and just restart its TTL clock
+        body_hash = hashlib.md5(response.content).hexdigest()
+        if body_hash == CACHE.get_hash("quote", symbol):
+            cached = CACHE.get_data("quote", symbol)
+            if cached is not None:
+                CACHE.touch("quote", symbol)
+                return cached, None
+
+        # Parse the response (orjson is a few times faster than stdlib json)
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            return None, "Error: Invalid response from server."
+
         # Check if we got valid data
         if not data or len(data) == 0:
             return None, f"Error: No data found for symbol '{symbol}'. Please check the symbol."
@@ -84,79 +166,179 @@ def get_stock_data(symbol):
         result = {
             "symbol": stock_data.get("symbol", symbol),
             "name": stock_data.get("name", f"{symbol} Inc."),
-            "price": stock_data.get("price", 0),
-            "change": stock_data.get("change", 0),
-            "change_percent": stock_data.get("changesPercentage", 0)
+            "price": float(stock_data.get("price") or 0),
+            "change": float(stock_data.get("change") or 0),
+            "change_percent": float(stock_data.get("changesPercentage") or 0)
         }
-        
+
+        CACHE.set("quote", symbol, result, body_hash)
+
         return result, None
-    
+
+    except requests.exceptions.HTTPError as e:
+        stale = _stale_quote(symbol)
+        if stale is not None:
+            return stale, None
+        return None, f"Error: API returned status code {e.response.status_code}"
     except requests.exceptions.ConnectionError:
+        stale = _stale_quote(symbol)
+        if stale is not None:
+            return stale, None
         return None, "Error: Connection failed. Please check your internet connection."
     except requests.exceptions.Timeout:
+        stale = _stale_quote(symbol)
+        if stale is not None:
+            return stale, None
         return None, "Error: Request timed out. The server took too long to respond."
+    except requests.exceptions.RequestException:
+        # Never echo request exceptions verbatim - their text can include the
+        # full request URL, API key and all
+        stale = _stale_quote(symbol)
+        if stale is not None:
+            return stale, None
+        return None, "Error: Request failed. Please try again later."
     except Exception as e:
         return None, f"Error: {str(e)}"
 
-# Input for stock symbol
-symbol = st.text_input("Please enter a symbol:", "")
+# Function to get quotes for several symbols in one request (the FMP quote
+# endpoint accepts comma-separated symbols), so N lookups cost 1 round-trip
+@st.cache_data(ttl=30, show_spinner=False)
+def get_stock_prices(symbols):
+    try:
+        if not symbols:
+            return None, "Error: Please enter at least one stock symbol."
+
+        # Clean and validate each symbol
+        symbols = [s.strip().upper() for s in symbols]
+        invalid = [s for s in symbols if not _SYMBOL_RE.match(s)]
+        if invalid:
+            return None, f"Error: Invalid stock symbol(s): {', '.join(invalid)}"
+
+        # One request for the whole batch
+        url = f"https://financialmodelingprep.com/api/v3/quote/{','.join(symbols)}?apikey={API_KEY}"
+        response = _session().get(url, timeout=_TIMEOUT)
+        response.raise_for_status()
+
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            return None, "Error: Invalid response from server."
+
+        if not data:
+            return None, "Error: No data found for the requested symbols."
+
+        # Map each returned quote by symbol
+        results = {}
+        for stock_data in data:
+            sym = stock_data.get("symbol")
+            results[sym] = {
+                "symbol": sym,
+                "name": stock_data.get("name", f"{sym} Inc."),
+                "price": float(stock_data.get("price") or 0),
+                "change": float(stock_data.get("change") or 0),
+                "change_percent": float(stock_data.get("changesPercentage") or 0)
+            }
+
+        # Seed the per-symbol disk cache so single-symbol lookups for these
+        # tickers are served without another request
+        for sym, quote in results.items():
+            CACHE.set("quote", sym, quote)
+
+        return results, None
+
+    except requests.exceptions.HTTPError as e:
+        return None, f"Error: API returned status code {e.response.status_code}"
+    except requests.exceptions.ConnectionError:
+        return None, "Error: Connection failed. Please check your internet connection."
+    except requests.exceptions.Timeout:
+        return None, "Error: Request timed out. The server took too long to respond."
+    except requests.exceptions.RequestException:
+        # As above: request exceptions can carry the keyed URL in their text
+        return None, "Error: Request failed. Please try again later."
+    except Exception as e:
+        return None, f"Error: {str(e)}"
+
+# Static no-symbol help, isolated in a fragment so app reruns triggered by
+# other widgets don't re-execute it
+@st.fragment
+def display_stock_guide():
+    st.info("Enter a stock symbol above (like AAPL, MSFT, GOOGL) and press Enter to see information.")
+
+    # Show examples of common stock symbols
+    st.markdown("### Common Stock Symbols")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(
+            "- **AAPL** (Apple)\n"
+            "- **MSFT** (Microsoft)\n"
+            "- **GOOGL** (Google)\n"
+            "- **AMZN** (Amazon)"
+        )
+    with col2:
+        st.markdown(
+            "- **META** (Meta/Facebook)\n"
+            "- **TSLA** (Tesla)\n"
+            "- **NFLX** (Netflix)\n"
+            "- **JPM** (JP Morgan Chase)"
+        )
+
+# Input for stock symbol, normalized once here so every consumer (and every
+# cache key) sees the same cleaned value
+symbol = (st.text_input("Please enter a symbol:", "") or "").strip().upper()
+
+# Placeholder the quote (or its error) renders into, so each new lookup
+# overwrites one slot instead of appending elements
+quote_slot = st.empty()
 
 # Process when symbol is provided
 if symbol:
     # Get stock data
     with st.spinner(f"Fetching data for {symbol}..."):
         stock_data, error = get_stock_data(symbol)
-    
+
+    quote = quote_slot.container()
     if error:
-        st.error(error)
+        quote.error(error)
     elif stock_data:
+        # Flag quotes served from an expired cache entry
+        if stock_data.get("stale"):
+            quote.warning("Live data is currently unavailable. Showing the most recent cached quote.")
+
         # Format current timestamp
-        now = datetime.now(pytz.timezone("US/Pacific"))
+        now = datetime.now(_PACIFIC)
         formatted_time = now.strftime("%a %b %d %H:%M:%S %Z %Y")
         
-        # Display date in bold
-        st.markdown(f"<div class='data-timestamp'>{formatted_time}</div>", unsafe_allow_html=True)
-        
-        # Display stock information
-        st.markdown(f"<div class='info-box'>", unsafe_allow_html=True)
-        
-        # Company name and symbol
-        company_name = stock_data["name"]
-        st.markdown(f"### {company_name} ({stock_data['symbol']})")
-        
         # Format price and change
+        company_name = stock_data["name"]
         price = stock_data["price"]
         change = stock_data["change"]
         change_percent = stock_data["change_percent"]
-        
-        # Add + sign if change is positive
-        sign = "+" if float(change) >= 0 else ""
-        change_class = "stock-change-positive" if float(change) >= 0 else "stock-change-negative"
-        
-        st.markdown(f"<div class='stock-price'>${price:.2f}</div>", unsafe_allow_html=True)
-        st.markdown(f"<div class='{change_class}'>{sign}{change:.2f} ({sign}{change_percent:.2f}%)</div>", unsafe_allow_html=True)
-        
-        st.markdown("</div>", unsafe_allow_html=True)
+
+        # Sign prefix and CSS class in one indexed lookup (change is already
+        # coerced to float by the fetchers)
+        sign, change_class = _SIGN_CLASS[change >= 0]
+
+        # Build the whole quote as one HTML blob so the rerun ships a single
+        # message instead of five
+        quote.markdown(
+            f"<div class='data-timestamp'>{formatted_time}</div>"
+            f"<div class='info-box'>"
+            f"<h3>{company_name} ({stock_data['symbol']})</h3>"
+            f"<div class='stock-price'>${price:.2f}</div>"
+            f"<div class='{change_class}'>{sign}{change:.2f} ({sign}{change_percent:.2f}%)</div>"
+            f"</div>",
+            unsafe_allow_html=True
+        )
     else:
-        st.error("Failed to retrieve stock data. Please check the symbol and try again.")
+        quote.error("Failed to retrieve stock data. Please check the symbol and try again.")
 
 # Display instructions if no symbol entered
 else:
-    st.info("Enter a stock symbol above (like AAPL, MSFT, GOOGL) and press Enter to see information.")
-    
-    # Show examples of common stock symbols
-    st.markdown("### Common Stock Symbols")
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("- **AAPL** (Apple)")
-        st.markdown("- **MSFT** (Microsoft)")
-        st.markdown("- **GOOGL** (Google)")
-        st.markdown("- **AMZN** (Amazon)")
-    with col2:
-        st.markdown("- **META** (Meta/Facebook)")
-        st.markdown("- **TSLA** (Tesla)")
-        st.markdown("- **NFLX** (Netflix)")
-        st.markdown("- **JPM** (JP Morgan Chase)")
+    display_stock_guide()
+    # Warm the quote caches for the guide's tickers with one batch request so
+    # picking any of them afterwards is answered locally; rendered content is
+    # already on screen, and a failed warm-up is simply discarded
+    get_stock_prices(COMMON_SYMBOLS)
 
 # Footer
 st.markdown("---")